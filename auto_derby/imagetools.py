@@ -106,9 +106,8 @@ def image_hash(
 def compare_hash(a: Text, b: Text) -> float:
     if a == b:
         return 1.0
-    cv_a = np.array(list(bytes.fromhex(a)), np.uint8)
-    cv_b = np.array(list(bytes.fromhex(b)), np.uint8)
-    res = _HASH_ALGORITHM.compare(cv_a, cv_b)
+    # hamming distance, same as `_HASH_ALGORITHM.compare`.
+    res = bin(int(a, 16) ^ int(b, 16)).count("1")
     return 1 - (res / (len(a) * 2))
 
 
@@ -168,49 +167,58 @@ def level(
     )
 
 
-def color_key(
-    img: np.ndarray, color: np.ndarray, threshold: float = 0.8, bit_size: int = 8
+def _color_key_from_distance(
+    squared_distance: np.ndarray, dtype: Any, threshold: float, bit_size: int
 ) -> np.ndarray:
     max_value = (1 << bit_size) - 1
-    assert img.shape == color.shape, (img.shape, color.shape)
-
-    if len(img.shape) == 2:
-        img = img[..., np.newaxis]
-        color = color[..., np.newaxis]
-
     # do this is somehow faster than
     # `numpy.linalg.norm(img.astype(int) - color.astype(int), axis=2,).clip(0, 255).astype(np.uint8)`
-    diff_img = (
-        np.asarray(
-            np.sqrt(
-                np.asarray(np.sum((img.astype(int) - color.astype(int)) ** 2, axis=2))
-            )
-        )
-        .clip(0, 255)
-        .astype(img.dtype)
-    )
+    diff_img = np.asarray(np.sqrt(squared_distance)).clip(0, 255).astype(dtype)
 
     ret = max_value - diff_img
     if threshold > 0:
-        mask_img = (ret > (max_value * threshold)).astype(img.dtype)
+        mask_img = (ret > (max_value * threshold)).astype(dtype)
         ret *= mask_img
     ret = ret.clip(0, 255)
-    ret = ret.astype(img.dtype)
+    ret = ret.astype(dtype)
     return ret
 
 
+def color_key(
+    img: np.ndarray, color: np.ndarray, threshold: float = 0.8, bit_size: int = 8
+) -> np.ndarray:
+    assert img.shape == color.shape, (img.shape, color.shape)
+
+    if len(img.shape) == 2:
+        img = img[..., np.newaxis]
+        color = color[..., np.newaxis]
+
+    return _color_key_from_distance(
+        np.asarray(np.sum((img.astype(int) - color.astype(int)) ** 2, axis=2)),
+        img.dtype,
+        threshold,
+        bit_size,
+    )
+
+
 def constant_color_key(
     img: np.ndarray, *colors: Tuple[int, ...], threshold: float = 0.8, bit_size: int = 8
 ) -> np.ndarray:
-    ret = np.zeros(img.shape[:2], dtype=img.dtype)
-
-    for color in colors:
-        match_img = color_key(
-            img, np.full_like(img, color), threshold=threshold, bit_size=bit_size
+    if not colors:
+        return np.zeros(img.shape[:2], dtype=img.dtype)
+
+    # key value only decrease with distance,
+    # so key by nearest color gives same result as max of each color key.
+    pixels = (img[..., np.newaxis] if len(img.shape) == 2 else img).astype(int)
+    squared_distance = np.asarray(np.sum((pixels - colors[0]) ** 2, axis=2))
+    for color in colors[1:]:
+        np.minimum(
+            squared_distance,
+            np.asarray(np.sum((pixels - color) ** 2, axis=2)),
+            out=squared_distance,
         )
-        ret = np.array(np.maximum(ret, match_img))
 
-    return ret
+    return _color_key_from_distance(squared_distance, img.dtype, threshold, bit_size)
 
 
 def compare_color_near(
@@ -255,23 +263,22 @@ def mix(a: np.ndarray, b: np.ndarray, a_mix: float) -> np.ndarray:
 def border_flood_fill(
     cv_img: np.ndarray, color: Tuple[int, ...] = (255,)
 ) -> np.ndarray:
-    h, w = cv_img.shape[:2]
-
-    border_points = (
-        *((0, i) for i in range(h)),
-        *((i, 0) for i in range(w)),
-        *((w - 1, i) for i in range(h)),
-        *((i, h - 1) for i in range(w)),
+    # same as flood fill from every zero border pixel,
+    # but labels all 4-connected zero areas in one pass.
+    components: Tuple[int, np.ndarray] = cv2.connectedComponents(  # type: ignore
+        (cv_img == 0).astype(np.uint8), connectivity=4
     )
+    label_count, labels = components
+    is_bg = np.zeros(label_count, dtype=bool)
+    is_bg[labels[0]] = True
+    is_bg[labels[-1]] = True
+    is_bg[labels[:, 0]] = True
+    is_bg[labels[:, -1]] = True
+    # label 0 is non-zero pixels
+    is_bg[0] = False
 
-    fill_mask_img = cv2.copyMakeBorder(cv_img, 1, 1, 1, 1, cv2.BORDER_CONSTANT)
     bg_mask_img = np.zeros_like(cv_img)
-    for i in border_points:
-        x, y = i
-        if cv_img[y, x] != 0:
-            continue
-        cv2.floodFill(bg_mask_img, fill_mask_img, (x, y), color, 0, 0)
-
+    bg_mask_img[is_bg[labels]] = color
     return bg_mask_img
 
 
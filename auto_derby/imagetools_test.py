@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from . import imagetools
 
 
@@ -15,3 +16,69 @@ from . import imagetools
 )
 def test_compare_color(a, b, expected):
     assert imagetools.compare_color(a, b) == expected
+
+
+@pytest.mark.parametrize(
+    "shape,colors",
+    [
+        ((32, 48, 3), ((255, 255, 255),)),
+        ((32, 48, 3), ((29, 62, 194), (24, 113, 218), (30, 109, 216))),
+        ((32, 48), ((255,), (0,))),
+    ],
+)
+def test_constant_color_key(shape, colors):
+    img = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+    # keep some pixels near colors, so threshold is tested
+    img[::4] = colors[0]
+    for threshold in (0, 0.8, 0.95):
+        expected = np.zeros(shape[:2], dtype=np.uint8)
+        for color in colors:
+            expected = np.asarray(
+                np.maximum(
+                    expected,
+                    imagetools.color_key(
+                        img, np.full_like(img, color), threshold=threshold
+                    ),
+                )
+            )
+        assert np.array_equal(
+            imagetools.constant_color_key(img, *colors, threshold=threshold),
+            expected,
+        )
+
+
+@pytest.mark.parametrize("size", (32, 64))
+def test_compare_hash(size: int):
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        a, b = (bytes(rng.integers(0, 256, size, dtype=np.uint8)) for _ in range(2))
+        res = imagetools._HASH_ALGORITHM.compare(  # type: ignore
+            np.frombuffer(a, np.uint8), np.frombuffer(b, np.uint8)
+        )
+        assert imagetools.compare_hash(a.hex(), b.hex()) == 1 - (res / (size * 4))
+
+
+def test_border_flood_fill():
+    img = np.array(
+        (
+            (0, 0, 0, 0, 0, 0),
+            (0, 1, 1, 1, 0, 0),
+            (0, 1, 0, 1, 0, 1),
+            (0, 1, 1, 1, 1, 0),
+            (1, 0, 0, 0, 1, 0),
+            (0, 1, 0, 0, 1, 0),
+        ),
+        dtype=np.uint8,
+    )
+    expected = np.array(
+        (
+            (1, 1, 1, 1, 1, 1),
+            (1, 0, 0, 0, 1, 1),
+            (1, 0, 0, 0, 1, 0),
+            (1, 0, 0, 0, 0, 1),
+            (0, 1, 1, 1, 0, 1),
+            (1, 0, 1, 1, 0, 1),
+        ),
+        dtype=np.uint8,
+    )
+    assert (imagetools.border_flood_fill(img) == expected * 255).all()
@@ -3,6 +3,9 @@
 
 from __future__ import annotations
 
+import functools
+import os
+import threading
 import traceback
 from concurrent import futures
 from typing import Callable, Iterator, Optional, Tuple
@@ -14,6 +17,7 @@ from PIL.Image import Image
 from PIL.Image import fromarray as image_from_array
 
 from ... import action, app, imagetools, mathtools, ocr, template, templates
+from ...constants import TrainingType
 from ...single_mode import Context, Training, training
 from ...single_mode.training import Partner
 from ..scene import Scene, SceneHolder
@@ -23,17 +27,103 @@ _TRAINING_CONFIRM = template.Specification(
     templates.SINGLE_MODE_TRAINING_CONFIRM, threshold=0.8
 )
 
+_KERNEL_ELLIPSE_5X5 = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+_KERNEL_ELLIPSE_3X7 = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 7))
+_KERNEL_ONES_3X3 = np.ones((3, 3), dtype=np.uint8)
+_KERNEL_SHARPEN = np.array(
+    (
+        (0, -1, 0),
+        (-1, 5, -1),
+        (0, -1, 0),
+    ),
+    dtype=np.float32,
+)
+
+
+class _g:
+    pool: Optional[futures.ThreadPoolExecutor] = None
+    partner_pool: Optional[futures.ThreadPoolExecutor] = None
+    partner_pool_lock = threading.Lock()
+
+
+def _pool() -> futures.ThreadPoolExecutor:
+    # recognition depends on process wide state (`app.log`, ocr labels),
+    # so reuse a thread pool between frames instead of worker processes.
+    if _g.pool is None:
+        _g.pool = futures.ThreadPoolExecutor(
+            max_workers=min(5, os.cpu_count() or 1),
+            thread_name_prefix="training-recognition",
+        )
+    return _g.pool
+
+
+def _partner_pool() -> futures.ThreadPoolExecutor:
+    # separated from `_pool`, partner recognition runs inside its tasks.
+    # called from every `_pool` worker, so create it only once.
+    with _g.partner_pool_lock:
+        if _g.partner_pool is None:
+            _g.partner_pool = futures.ThreadPoolExecutor(
+                max_workers=min(5, os.cpu_count() or 1),
+                thread_name_prefix="partner-recognition",
+            )
+        return _g.partner_pool
+
 
 def _gradient(colors: Tuple[Tuple[Tuple[int, int, int], int], ...]) -> np.ndarray:
-    ret = np.linspace((0, 0, 0), colors[0][0], colors[0][1])
-    for index, i in enumerate(colors[1:], 1):
-        color, stop = i
-        prev_color, prev_stop = colors[index - 1]
-        g = np.linspace(prev_color, color, stop - prev_stop + 1)
-        ret = np.concatenate((ret, g[1:]))
+    assert colors[0][1] == 0, colors
+    stops = np.array(tuple(stop for _, stop in colors))
+    values = np.array(tuple(color for color, _ in colors), dtype=float)
+    pos = np.array(range(1, colors[-1][1] + 1))
+    # index of segment end, first stop wins when stops are same.
+    end = cast.instance(
+        np.searchsorted(stops, pos, side="left"), np.ndarray  # type: ignore
+    )
+    start = end - 1
+    ratio = np.asarray((pos - stops[start]) / (stops[end] - stops[start]))
+    return np.asarray(
+        values[start] + (values[end] - values[start]) * ratio[:, np.newaxis]
+    )
+
+
+# color, stop position relative to image height
+_GradientSpec = Tuple[Tuple[Tuple[int, int, int], float], ...]
+
+_BASE_EFFECT_GRADIENT: _GradientSpec = (
+    ((140, 236, 255), 0),
+    ((140, 236, 255), 0.25),
+    ((114, 229, 255), 0.35),
+    ((113, 198, 255), 0.55),
+    ((95, 179, 255), 0.63),
+    ((74, 157, 255), 0.70),
+    ((74, 117, 255), 0.83),
+    ((74, 117, 255), 1),
+)
+
+_RED_EFFECT_GRADIENT: _GradientSpec = (
+    ((129, 211, 255), 0),
+    ((126, 188, 255), 0.5),
+    ((82, 134, 255), 0.75),
+    ((36, 62, 211), 1),
+)
+
+
+@functools.lru_cache(maxsize=32)
+def _fill_img(gradient: _GradientSpec, height: int, width: int) -> np.ndarray:
+    fill_gradient = _gradient(
+        tuple((color, round(height * stop)) for color, stop in gradient)
+    ).astype(np.uint8)
+    ret = np.repeat(np.expand_dims(fill_gradient, 1), width, axis=1)
+    # shared between calls.
+    ret.setflags(write=False)  # type: ignore
     return ret
 
 
+# +100 has different color
+_BASE_EFFECT_HASH_100 = (
+    "000000000000006600ee00ff00ff00ff004e0000000000000000000000000000"
+)
+
+
 def _recognize_base_effect(img: Image) -> int:
     cv_img = imagetools.cv_image(imagetools.resize(img, height=32))
     sharpened_img = imagetools.sharpen(cv_img)
@@ -46,12 +136,12 @@ def _recognize_base_effect(img: Image) -> int:
     white_outline_img_dilated = cv2.morphologyEx(
         white_outline_img,
         cv2.MORPH_DILATE,
-        cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5)),
+        _KERNEL_ELLIPSE_5X5,
     )
     white_outline_img_dilated = cv2.morphologyEx(
         white_outline_img_dilated,
         cv2.MORPH_CLOSE,
-        cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 7)),
+        _KERNEL_ELLIPSE_3X7,
     )
 
     bg_mask_img = (
@@ -77,19 +167,7 @@ def _recognize_base_effect(img: Image) -> int:
     bg_mask_img = imagetools.bg_mask_by_outline(brown_outline_img)
     masked_img = cv2.copyTo(masked_img, 255 - bg_mask_img)
 
-    fill_gradient = _gradient(
-        (
-            ((140, 236, 255), 0),
-            ((140, 236, 255), round(cv_img.shape[0] * 0.25)),
-            ((114, 229, 255), round(cv_img.shape[0] * 0.35)),
-            ((113, 198, 255), round(cv_img.shape[0] * 0.55)),
-            ((95, 179, 255), round(cv_img.shape[0] * 0.63)),
-            ((74, 157, 255), round(cv_img.shape[0] * 0.70)),
-            ((74, 117, 255), round(cv_img.shape[0] * 0.83)),
-            ((74, 117, 255), cv_img.shape[0]),
-        )
-    ).astype(np.uint8)
-    fill_img = np.repeat(np.expand_dims(fill_gradient, 1), cv_img.shape[1], axis=1)
+    fill_img = _fill_img(_BASE_EFFECT_GRADIENT, *cv_img.shape[:2])
     assert fill_img.shape == cv_img.shape
 
     text_img = imagetools.color_key(masked_img, fill_img)
@@ -125,12 +203,10 @@ def _recognize_base_effect(img: Image) -> int:
         # ignore skin match result
         return 0
 
-    # +100 has different color
-    hash100 = "000000000000006600ee00ff00ff00ff004e0000000000000000000000000000"
     if (
         imagetools.compare_hash(
             imagetools.image_hash(imagetools.pil_image(text_img)),
-            hash100,
+            _BASE_EFFECT_HASH_100,
         )
         > 0.9
     ):
@@ -148,17 +224,7 @@ def _recognize_red_effect(img: Image) -> int:
             height=48,
         )
     )
-    sharpened_img = cv2.filter2D(
-        cv_img,
-        8,
-        np.array(
-            (
-                (0, -1, 0),
-                (-1, 5, -1),
-                (0, -1, 0),
-            )
-        ),
-    )
+    sharpened_img = cv2.filter2D(cv_img, 8, _KERNEL_SHARPEN)
     sharpened_img = imagetools.mix(sharpened_img, cv_img, 0.5)
 
     white_outline_img = imagetools.constant_color_key(
@@ -171,6 +237,9 @@ def _recognize_red_effect(img: Image) -> int:
     )
 
     masked_img = imagetools.inside_outline(cv_img, white_outline_img)
+    if not masked_img.any():
+        # no text, skip remaining passes.
+        return 0
 
     red_outline_img = imagetools.constant_color_key(
         cv_img,
@@ -183,21 +252,14 @@ def _recognize_red_effect(img: Image) -> int:
     red_outline_img = cv2.morphologyEx(
         red_outline_img,
         cv2.MORPH_CLOSE,
-        np.ones((3, 3)),
+        _KERNEL_ONES_3X3,
     )
 
     masked_img = imagetools.inside_outline(masked_img, red_outline_img)
+    if not masked_img.any():
+        return 0
 
-    height = cv_img.shape[0]
-    fill_gradient = _gradient(
-        (
-            ((129, 211, 255), 0),
-            ((126, 188, 255), round(height * 0.5)),
-            ((82, 134, 255), round(height * 0.75)),
-            ((36, 62, 211), height),
-        )
-    ).astype(np.uint8)
-    fill_img = np.repeat(np.expand_dims(fill_gradient, 1), cv_img.shape[1], axis=1)
+    fill_img = _fill_img(_RED_EFFECT_GRADIENT, *cv_img.shape[:2])
     assert fill_img.shape == cv_img.shape
 
     text_img_base = imagetools.color_key(masked_img, fill_img)
@@ -242,17 +304,24 @@ def _recognize_red_effect(img: Image) -> int:
     return int(text.lstrip("+"))
 
 
+_LEVEL_COLORS = np.array(
+    (
+        (49, 178, 22),  # level 1
+        (46, 139, 244),  # level 2
+        (255, 134, 0),  # level 3
+        (244, 69, 132),  # level 4
+        (165, 78, 255),  # level 5
+    )
+)
+
+
 def _recognize_level(rgb_color: Tuple[int, ...]) -> int:
-    if imagetools.compare_color((49, 178, 22), rgb_color) > 0.9:
-        return 1
-    if imagetools.compare_color((46, 139, 244), rgb_color) > 0.9:
-        return 2
-    if imagetools.compare_color((255, 134, 0), rgb_color) > 0.9:
-        return 3
-    if imagetools.compare_color((244, 69, 132), rgb_color) > 0.9:
-        return 4
-    if imagetools.compare_color((165, 78, 255), rgb_color) > 0.9:
-        return 5
+    if len(rgb_color) == 3:
+        squared_distance = np.asarray(np.sum((_LEVEL_COLORS - rgb_color) ** 2, axis=1))
+        index = int(squared_distance.argmin())  # type: ignore
+        # same as `imagetools.compare_color(...) > 0.9`
+        if squared_distance[index] < (255 * 0.1) ** 2:
+            return index + 1
     raise ValueError("_recognize_level: unknown level color: %s" % (rgb_color,))
 
 
@@ -294,19 +363,21 @@ def _recognize_failure_rate(
     return int(text.strip("%")) / 100
 
 
-def _estimate_vitality(ctx: Context, trn: Training) -> float:
-    # https://gamewith.jp/uma-musume/article/show/257432
-    vit_data = {
-        trn.TYPE_SPEED: (-21, -22, -23, -25, -27),
-        trn.TYPE_STAMINA: (-19, -20, -21, -23, -25),
-        trn.TYPE_POWER: (-20, -21, -22, -24, -26),
-        trn.TYPE_GUTS: (-22, -23, -24, -26, -28),
-        trn.TYPE_WISDOM: (5, 5, 5, 5, 5),
-    }
+# https://gamewith.jp/uma-musume/article/show/257432
+_VITALITY_BY_LEVEL = {
+    Training.TYPE_SPEED: (-21, -22, -23, -25, -27),
+    Training.TYPE_STAMINA: (-19, -20, -21, -23, -25),
+    Training.TYPE_POWER: (-20, -21, -22, -24, -26),
+    Training.TYPE_GUTS: (-22, -23, -24, -26, -28),
+    Training.TYPE_WISDOM: (5, 5, 5, 5, 5),
+}
+
 
-    if trn.type not in vit_data:
+def _estimate_vitality(ctx: Context, trn: Training) -> float:
+    vit_data = _VITALITY_BY_LEVEL.get(trn.type)
+    if vit_data is None:
         return 0
-    return vit_data[trn.type][trn.level - 1] / ctx.max_vitality
+    return vit_data[trn.level - 1] / ctx.max_vitality
 
 
 def _iter_training_images(static: bool):
@@ -335,8 +406,36 @@ def _iter_training_images(static: bool):
             seen_confirm_pos.add(pos)
 
 
-def _recognize_type_color(rp: mathtools.ResizeProxy, icon_img: Image) -> int:
-    type_pos = rp.vector2((7, 18), 540)
+class _PartnerLayout:
+    def __init__(self, rp: mathtools.ResizeProxy) -> None:
+        self.type_pos = rp.vector2((7, 18), 540)
+        self.hint_bbox = rp.vector4((50, 0, 58, 8), 540)
+        self.has_training_bbox = rp.vector4((52, 0, 65, 8), 540)
+        self.soul_burst_bbox = self.has_training_bbox
+        self.partner_level_positions = (
+            rp.vector2((10, 65), 540),  # level 1
+            rp.vector2((20, 65), 540),  # level 2
+            rp.vector2((33, 65), 540),  # level 3
+            rp.vector2((43, 65), 540),  # level 4
+            rp.vector2((55, 65), 540),  # level 5
+        )
+        # relative to icon bbox left top
+        self.soul_full_bbox = rp.vector4((49, 32, 74, 58), 540)
+        self.soul_bbox_padding = (
+            rp.vector(35, 540),
+            rp.vector(33, 540),
+            rp.vector(2, 540),
+            rp.vector(0, 540),
+        )
+
+
+@functools.lru_cache(maxsize=8)
+def _partner_layout(img_width: int) -> _PartnerLayout:
+    return _PartnerLayout(mathtools.ResizeProxy(img_width))
+
+
+def _recognize_type_color(layout: _PartnerLayout, icon_img: Image) -> int:
+    type_pos = layout.type_pos
     type_colors = (
         ((36, 170, 255), Partner.TYPE_SPEED),
         ((255, 106, 86), Partner.TYPE_STAMINA),
@@ -356,8 +455,8 @@ def _recognize_type_color(rp: mathtools.ResizeProxy, icon_img: Image) -> int:
     return Partner.TYPE_OTHER
 
 
-def _recognize_has_hint(rp: mathtools.ResizeProxy, icon_img: Image) -> bool:
-    bbox = rp.vector4((50, 0, 58, 8), 540)
+def _recognize_has_hint(layout: _PartnerLayout, icon_img: Image) -> bool:
+    bbox = layout.hint_bbox
     hint_mark_color = (127, 67, 255)
     hint_mark_img = icon_img.crop(bbox)
     hint_mask = imagetools.constant_color_key(
@@ -367,11 +466,11 @@ def _recognize_has_hint(rp: mathtools.ResizeProxy, icon_img: Image) -> bool:
 
 
 def _recognize_has_training(
-    ctx: Context, rp: mathtools.ResizeProxy, icon_img: Image
+    ctx: Context, layout: _PartnerLayout, icon_img: Image
 ) -> bool:
     if ctx.scenario != ctx.SCENARIO_AOHARU:
         return False
-    bbox = rp.vector4((52, 0, 65, 8), 540)
+    bbox = layout.has_training_bbox
     mark_img = icon_img.crop(bbox)
     mask = imagetools.constant_color_key(
         imagetools.cv_image(mark_img),
@@ -394,11 +493,11 @@ def _recognize_has_training(
 
 
 def _recognize_has_soul_burst(
-    ctx: Context, rp: mathtools.ResizeProxy, icon_img: Image
+    ctx: Context, layout: _PartnerLayout, icon_img: Image
 ) -> bool:
     if ctx.scenario != ctx.SCENARIO_AOHARU:
         return False
-    bbox = rp.vector4((52, 0, 65, 8), 540)
+    bbox = layout.soul_burst_bbox
     mark_img = imagetools.cv_image(icon_img.crop(bbox))
     mask = imagetools.constant_color_key(
         mark_img,
@@ -420,89 +519,71 @@ def _recognize_has_soul_burst(
     return ret
 
 
-def _recognize_partner_level(rp: mathtools.ResizeProxy, icon_img: Image) -> int:
-    pos = (
-        rp.vector2((10, 65), 540),  # level 1
-        rp.vector2((20, 65), 540),  # level 2
-        rp.vector2((33, 65), 540),  # level 3
-        rp.vector2((43, 65), 540),  # level 4
-        rp.vector2((55, 65), 540),  # level 5
-    )
-    colors = (
+_PARTNER_LEVEL_COLORS = np.array(
+    (
         (109, 108, 119),  # empty
-        (42, 192, 255),  # level 1
-        (42, 192, 255),  # level 2
+        (42, 192, 255),  # level 1, level 2
         (162, 230, 30),  # level 3
         (255, 173, 30),  # level 4
         (255, 235, 120),  # level 5
     )
-    spec: Tuple[Tuple[Tuple[Tuple[int, int], Tuple[int, int, int]], ...], ...] = (
-        # level 0
-        (
-            (pos[0], colors[0]),
-            (pos[1], colors[0]),
-            (pos[2], colors[0]),
-            (pos[3], colors[0]),
-            (pos[4], colors[0]),
-        ),
-        # level 1
-        (
-            (pos[0], colors[1]),
-            (pos[1], colors[0]),
-            (pos[2], colors[0]),
-            (pos[3], colors[0]),
-            (pos[4], colors[0]),
-        ),
-        # level 2
-        (
-            (pos[0], colors[2]),
-            (pos[1], colors[2]),
-            (pos[3], colors[0]),
-            (pos[4], colors[0]),
-        ),
-        # level 3
-        (
-            (pos[0], colors[3]),
-            (pos[1], colors[3]),
-            (pos[2], colors[3]),
-            (pos[4], colors[0]),
-        ),
-        # level 4
-        (
-            (pos[0], colors[4]),
-            (pos[1], colors[4]),
-            (pos[2], colors[4]),
-            (pos[3], colors[4]),
-        ),
-        # level 5
-        (
-            (pos[0], colors[5]),
-            (pos[4], colors[5]),
-        ),
+)[:, ::-1]
+
+# color index at each level position for each level, -1 means not checked.
+_PARTNER_LEVEL_SPEC = np.array(
+    (
+        (0, 0, 0, 0, 0),  # level 0
+        (1, 0, 0, 0, 0),  # level 1
+        (1, 1, -1, 0, 0),  # level 2
+        (2, 2, 2, -1, 0),  # level 3
+        (3, 3, 3, 3, -1),  # level 4
+        (4, -1, -1, -1, 4),  # level 5
     )
+)
 
-    for level, s in enumerate(spec):
-        if all(
-            imagetools.compare_color_near(
-                imagetools.cv_image(icon_img),
-                pos,
-                color[::-1],
-            )
-            > 0.95
-            for pos, color in s
-        ):
+
+def _recognize_partner_level(layout: _PartnerLayout, icon_img: Image) -> int:
+    cv_img = imagetools.cv_image(icon_img)
+    # same as `imagetools.compare_color_near(...) > 0.95` for every position and color.
+    offsets = np.array(range(-2, 2))
+    xs = np.array(tuple(x for x, _ in layout.partner_level_positions))
+    ys = np.array(tuple(y for _, y in layout.partner_level_positions))
+    patches = np.asarray(
+        cv_img[
+            ys[:, np.newaxis, np.newaxis] + offsets[np.newaxis, :, np.newaxis],
+            xs[:, np.newaxis, np.newaxis] + offsets[np.newaxis, np.newaxis, :],
+        ]
+    ).reshape((len(xs), 1, -1, 3))
+    squared_distance = np.asarray(
+        np.sum(
+            (patches.astype(int) - _PARTNER_LEVEL_COLORS[:, np.newaxis, :]) ** 2,
+            axis=3,
+        )
+    )
+    is_near = np.asarray(squared_distance.min(axis=2) < 13**2)
+    matched = np.asarray(
+        np.all(  # type: ignore
+            np.asarray(
+                is_near[range(len(xs)), _PARTNER_LEVEL_SPEC] | (_PARTNER_LEVEL_SPEC < 0)
+            ),
+            axis=1,
+        )
+    )
+    for level, v in enumerate(matched):
+        if v:
             return level
     return -1
 
 
 def _recognize_soul(
-    rp: mathtools.ResizeProxy, screenshot: Image, icon_bbox: Tuple[int, int, int, int]
+    layout: _PartnerLayout, screenshot: Image, icon_bbox: Tuple[int, int, int, int]
 ) -> float:
+    l, t, r, b = layout.soul_full_bbox
     right_bottom_icon_bbox = (
-        icon_bbox[0] + rp.vector(49, 540),
-        icon_bbox[1] + rp.vector(32, 540),
-        icon_bbox[0] + rp.vector(74, 540),
-        icon_bbox[1] + rp.vector(58, 540),
+        icon_bbox[0] + l,
+        icon_bbox[1] + t,
+        icon_bbox[0] + r,
+        icon_bbox[1] + b,
     )
 
     right_bottom_icon_img = screenshot.crop(right_bottom_icon_bbox)
@@ -512,11 +593,12 @@ def _recognize_soul(
     if is_full:
         return 1
 
+    l, t, r, b = layout.soul_bbox_padding
     soul_bbox = (
-        icon_bbox[0] - rp.vector(35, 540),
-        icon_bbox[1] + rp.vector(33, 540),
-        icon_bbox[0] + rp.vector(2, 540),
-        icon_bbox[3] - rp.vector(0, 540),
+        icon_bbox[0] - l,
+        icon_bbox[1] + t,
+        icon_bbox[0] + r,
+        icon_bbox[3] - b,
     )
     img = screenshot.crop(soul_bbox)
     img = imagetools.resize(img, height=40)
@@ -571,22 +653,22 @@ def _recognize_soul(
 def _recognize_partner_icon(
     ctx: Context, img: Image, bbox: Tuple[int, int, int, int]
 ) -> Optional[training.Partner]:
-    rp = mathtools.ResizeProxy(img.width)
+    layout = _partner_layout(img.width)
     icon_img = img.crop(bbox)
     app.log.image("partner icon", icon_img, level=app.DEBUG)
-    level = _recognize_partner_level(rp, icon_img)
+    level = _recognize_partner_level(layout, icon_img)
 
     soul = -1
     has_training = False
     has_soul_burst = False
     if ctx.scenario == ctx.SCENARIO_AOHARU:
-        has_soul_burst = _recognize_has_soul_burst(ctx, rp, icon_img)
+        has_soul_burst = _recognize_has_soul_burst(ctx, layout, icon_img)
         if has_soul_burst:
             has_training = True
             soul = 1
         else:
-            has_training = _recognize_has_training(ctx, rp, icon_img)
-            soul = _recognize_soul(rp, img, bbox)
+            has_training = _recognize_has_training(ctx, layout, icon_img)
+            soul = _recognize_soul(layout, img, bbox)
 
     if level < 0 and soul < 0:
         return None
@@ -594,13 +676,13 @@ def _recognize_partner_icon(
     self.icon_bbox = bbox
     self.level = level
     self.soul = soul
-    self.has_hint = _recognize_has_hint(rp, icon_img)
+    self.has_hint = _recognize_has_hint(layout, icon_img)
     self.has_training = has_training
     self.has_soul_burst = has_soul_burst
     if self.has_soul_burst:
         self.has_training = True
         self.soul = 1
-    self.type = _recognize_type_color(rp, icon_img)
+    self.type = _recognize_type_color(layout, icon_img)
     if soul >= 0 and self.type == Partner.TYPE_OTHER:
         self.type = Partner.TYPE_TEAMMATE
     app.log.text("partner: %s" % self, level=app.DEBUG)
@@ -625,17 +707,14 @@ def _recognize_partners(ctx: Context, img: Image) -> Iterator[training.Partner]:
         ),
     }[ctx.scenario]
     icons_bottom = rp.vector(578, 540)
-    while icon_bbox[2] < icons_bottom:
-        v = _recognize_partner_icon(ctx, img, icon_bbox)
+    l, t, r, b = icon_bbox
+    bboxes = [(l, t + i, r, b + i) for i in range(0, icons_bottom - t, icon_y_offset)]
+    for v in _partner_pool().map(
+        functools.partial(_recognize_partner_icon, ctx, img), bboxes
+    ):
         if not v:
             break
         yield v
-        icon_bbox = (
-            icon_bbox[0],
-            icon_bbox[1] + icon_y_offset,
-            icon_bbox[2],
-            icon_bbox[3] + icon_y_offset,
-        )
 
 
 _Vector4 = Tuple[int, int, int, int]
@@ -671,6 +750,25 @@ def _effect_recognitions(
         raise NotImplementedError(ctx.scenario)
 
 
+@functools.lru_cache(maxsize=16)
+def _training_type_centers(
+    width: int,
+) -> Tuple[Tuple[TrainingType, Tuple[int, int]], ...]:
+    rp = mathtools.ResizeProxy(width)
+    return tuple(
+        zip(
+            Training.ALL_TYPES,
+            (
+                rp.vector2((78, 850), 540),
+                rp.vector2((171, 850), 540),
+                rp.vector2((268, 850), 540),
+                rp.vector2((367, 850), 540),
+                rp.vector2((461, 850), 540),
+            ),
+        )
+    )
+
+
 def _recognize_training(ctx: Context, img: Image) -> Training:
     try:
         rp = mathtools.ResizeProxy(img.width)
@@ -685,16 +783,7 @@ def _recognize_training(ctx: Context, img: Image) -> Training:
             )
         )[1]
         radius = rp.vector(30, 540)
-        for t, center in zip(
-            Training.ALL_TYPES,
-            (
-                rp.vector2((78, 850), 540),
-                rp.vector2((171, 850), 540),
-                rp.vector2((268, 850), 540),
-                rp.vector2((367, 850), 540),
-                rp.vector2((461, 850), 540),
-            ),
-        ):
+        for t, center in _training_type_centers(img.width):
             if mathtools.distance(self.confirm_position, center) < radius:
                 self.type = t
                 break
@@ -760,14 +849,14 @@ class TrainingScene(Scene):
         return self.recognize_v2(ctx)
 
     def recognize_v2(self, ctx: Context, static: bool = False) -> None:
-        with futures.ThreadPoolExecutor() as pool:
-            self.trainings = tuple(
-                i.result()
-                for i in [
-                    pool.submit(_recognize_training, ctx, j)
-                    for j in _iter_training_images(static)
-                ]
-            )
+        pool = _pool()
+        self.trainings = tuple(
+            i.result()
+            for i in [
+                pool.submit(_recognize_training, ctx, j)
+                for j in _iter_training_images(static)
+            ]
+        )
         assert len(set(i.type for i in self.trainings)) == len(
             self.trainings
         ), "duplicated trainings"
@@ -1,8 +1,11 @@
 # -*- coding=UTF-8 -*-
 
+import bisect
 import datetime
+import os
+import time
 from abc import abstractmethod
-from typing import List, Text
+from typing import Dict, List, Optional, Text, Tuple
 
 import auto_derby
 from auto_derby import app, single_mode
@@ -13,6 +16,49 @@ from auto_derby.single_mode.race.race import Race
 JST = datetime.timezone(datetime.timedelta(hours=9), name="JST")
 
 
+class _RaceResults:
+    """Results of one race, sorted by time."""
+
+    def __init__(self, rows: List[Tuple[float, int]]) -> None:
+        rows.sort()
+        self.times = [timestamp for timestamp, _ in rows]
+        self.orders = [order for _, order in rows]
+
+
+_EMPTY_RESULTS = _RaceResults([])
+
+
+class _g:
+    results_key: Optional[Tuple[Text, int, int]] = None
+    results_by_name: Dict[Text, _RaceResults] = {}
+    matches_key: Optional[Tuple[int, Tuple[Text, int, int]]] = None
+    matches: Dict[Text, bool] = {}
+
+
+def _results_key() -> Tuple[Text, int, int]:
+    p = race_result.g.result_path
+    try:
+        stat = os.stat(p)
+        return (p, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return (p, 0, 0)
+
+
+def _results_by_name() -> Dict[Text, _RaceResults]:
+    # result file is append only during nurturing,
+    # so only read it again when it changed.
+    key = _results_key()
+    if key != _g.results_key:
+        rows_by_name: Dict[Text, List[Tuple[float, int]]] = {}
+        for r in race_result.iterate():
+            rows_by_name.setdefault(r.race.name, []).append(
+                (r.time.timestamp(), r.order)
+            )
+        _g.results_by_name = {k: _RaceResults(v) for k, v in rows_by_name.items()}
+        _g.results_key = key
+    return _g.results_by_name
+
+
 class Campaign:
     def __init__(
         self,
@@ -22,15 +68,18 @@ class Campaign:
     ) -> None:
         self.start = start
         self.end = end
+        self.start_ts = start.timestamp()
+        self.end_ts = end.timestamp()
         self.race_name = race_name
         super().__init__()
 
     @abstractmethod
-    def match(self, ctx: Context, race: Race) -> bool:
+    def match(self, ctx: Context, race: Race, now: Optional[float] = None) -> bool:
         if race.name != self.race_name:
             return False
-        now = datetime.datetime.now(JST)
-        if not (self.start <= now <= self.end):
+        if now is None:
+            now = time.time()
+        if not (self.start_ts <= now <= self.end_ts):
             return False
         return True
 
@@ -50,18 +99,25 @@ class OncePerDayCampaign(Campaign):
             race_name,
         )
         self.order_lte = order_lte
+        self._satisfied_date: Optional[datetime.date] = None
 
-    def match(self, ctx: Context, race: Race) -> bool:
-        if not super().match(ctx, race):
+    def match(self, ctx: Context, race: Race, now: Optional[float] = None) -> bool:
+        if now is None:
+            now = time.time()
+        if not super().match(ctx, race, now):
+            return False
+        today = datetime.datetime.fromtimestamp(now, JST).date()
+        if self._satisfied_date == today:
+            return False
+        start = datetime.datetime.combine(today, datetime.time(tzinfo=JST)).timestamp()
+        end = start + datetime.timedelta(days=1).total_seconds()
+        # results in [start, end)
+        results = _results_by_name().get(race.name, _EMPTY_RESULTS)
+        lo = bisect.bisect_left(results.times, start)
+        hi = bisect.bisect_left(results.times, end)
+        if any(i <= self.order_lte for i in results.orders[lo:hi]):
+            self._satisfied_date = today
             return False
-        for r in race_result.iterate():
-            if (
-                r.race.name == race.name
-                and r.order <= self.order_lte
-                and r.time.astimezone(JST).date() == datetime.datetime.now(JST).date()
-            ):
-                return False
-
         return True
 
 
@@ -80,22 +136,25 @@ class OneTimeCampaign(Campaign):
             race_name,
         )
         self.order_lte = order_lte
+        # reward can only be claimed once in campaign.
+        self._satisfied = False
 
-    def match(self, ctx: Context, race: Race) -> bool:
-        if not super().match(ctx, race):
+    def match(self, ctx: Context, race: Race, now: Optional[float] = None) -> bool:
+        if not super().match(ctx, race, now):
+            return False
+        if self._satisfied:
+            return False
+        results = _results_by_name().get(race.name, _EMPTY_RESULTS)
+        # results in (start, end]
+        lo = bisect.bisect_right(results.times, self.start_ts)
+        hi = bisect.bisect_right(results.times, self.end_ts)
+        if any(i <= self.order_lte for i in results.orders[lo:hi]):
+            self._satisfied = True
             return False
-        for r in race_result.iterate():
-            if (
-                r.race.name == race.name
-                and r.order <= self.order_lte
-                and self.start < r.time.astimezone(JST) <= self.end
-            ):
-                return False
-
         return True
 
 
-_CAMPAIGNS: List[Campaign] = []
+_CAMPAIGNS_BY_NAME: Dict[Text, List[Campaign]] = {}
 
 
 def _add_campaign(
@@ -107,26 +166,53 @@ def _add_campaign(
     if not (c.start - datetime.timedelta(days=1) <= now <= c.end):
         return
 
-    _CAMPAIGNS.append(c)
+    _CAMPAIGNS_BY_NAME.setdefault(c.race_name, []).append(c)
+
+
+def _prune_campaigns(now: float) -> None:
+    for name, campaigns in tuple(_CAMPAIGNS_BY_NAME.items()):
+        campaigns[:] = (i for i in campaigns if now <= i.end_ts)
+        if not campaigns:
+            del _CAMPAIGNS_BY_NAME[name]
+
+
+def _any_campaign_matches(ctx: Context, race: Race) -> bool:
+    # races are scored many times in one pass,
+    # reuse result until time (in seconds) or race results changed.
+    now = time.time()
+    key = (int(now), _results_key())
+    if key != _g.matches_key:
+        # process may run longer than campaign.
+        _prune_campaigns(now)
+        _g.matches = {}
+        _g.matches_key = key
+    if race.name not in _g.matches:
+        _g.matches[race.name] = any(
+            i.match(ctx, race, now) for i in _CAMPAIGNS_BY_NAME.get(race.name, ())
+        )
+    return _g.matches[race.name]
 
 
 class Plugin(auto_derby.Plugin):
     """Pick race by campaign."""
 
     def install(self) -> None:
-        if not _CAMPAIGNS:
+        if not _CAMPAIGNS_BY_NAME:
             app.log.text("no race campaign today")
             return
 
-        for i in _CAMPAIGNS:
-            app.log.text("race campaign: %s~%s %s" % (i.start, i.end, i.race_name))
+        _g.matches_key = None
+        for campaigns in _CAMPAIGNS_BY_NAME.values():
+            for i in campaigns:
+                app.log.text("race campaign: %s~%s %s" % (i.start, i.end, i.race_name))
 
         class Race(auto_derby.config.single_mode_race_class):
             def score(self, ctx: single_mode.Context) -> float:
                 ret = super().score(ctx)
                 if ret < 0:
                     return ret
-                if any(i.match(ctx, self) for i in _CAMPAIGNS):
+                # most races are not in campaign.
+                if self.name in _CAMPAIGNS_BY_NAME and _any_campaign_matches(ctx, self):
                     ret += 100
                 return ret
 